@@ -0,0 +1,11 @@
+import os
+from setuptools import setup
+
+# The Cython chunker is opt-in; without it prompt2pipes falls back to pure Python.
+# Cython is not a build requirement, so build with --no-build-isolation when enabling it.
+ext_modules = []
+if os.environ.get("PROMPT2PIPES_ENABLE_SPEEDUPS"):
+    from Cython.Build import cythonize
+    ext_modules = cythonize(["src/prompt2pipes/_fast.pyx"], language_level=3)
+
+setup(ext_modules=ext_modules)
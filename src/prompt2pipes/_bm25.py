@@ -0,0 +1,60 @@
+"""Okapi BM25 over a column-compressed term/document matrix.
+
+Drop-in for rank_bm25.BM25Okapi (same k1/b/epsilon defaults and idf flooring),
+but per-posting score contributions are precomputed at build time, so a query
+costs one vectorized gather per query token instead of a Python loop over docs.
+"""
+from __future__ import annotations
+from collections import Counter
+from typing import Dict, Iterable, List
+import numpy as np
+
+class BM25Okapi:
+    def __init__(self, corpus: List[List[str]], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.corpus_size = len(corpus)
+        self.k1 = k1
+        self.b = b
+
+        vocab: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        tfs: List[int] = []
+        for i, doc in enumerate(corpus):
+            for tok, tf in Counter(doc).items():
+                cols.append(vocab.setdefault(tok, len(vocab)))
+                rows.append(i)
+                tfs.append(tf)
+        self.vocab = vocab
+
+        doc_len = np.fromiter((len(d) for d in corpus), dtype=np.float64, count=self.corpus_size)
+        self.avgdl = float(doc_len.mean()) if self.corpus_size else 0.0
+        k_norm = k1 * (1 - b + b * doc_len / (self.avgdl or 1.0))
+
+        col_arr = np.asarray(cols, dtype=np.intp)
+        order = np.argsort(col_arr, kind="stable")
+        self.doc_idx = np.asarray(rows, dtype=np.intp)[order]
+        tf = np.asarray(tfs, dtype=np.float64)[order]
+
+        df = np.bincount(col_arr, minlength=len(vocab))
+        self.indptr = np.zeros(len(vocab) + 1, dtype=np.intp)
+        np.cumsum(df, out=self.indptr[1:])
+
+        idf = np.log(self.corpus_size - df + 0.5) - np.log(df + 0.5)
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+        self.idf = idf
+
+        # Score of each (term, doc) posting; a query just sums the relevant slices
+        term_of_posting = np.repeat(np.arange(len(vocab), dtype=np.intp), df)
+        self.contrib = idf[term_of_posting] * (tf * (k1 + 1) / (tf + k_norm[self.doc_idx]))
+
+    def get_scores(self, query: Iterable[str]) -> np.ndarray:
+        scores = np.zeros(self.corpus_size)
+        for tok in query:
+            c = self.vocab.get(tok)
+            if c is None:
+                continue
+            lo, hi = self.indptr[c], self.indptr[c + 1]
+            # doc indices are unique within one term's postings, so fancy-index += is safe
+            scores[self.doc_idx[lo:hi]] += self.contrib[lo:hi]
+        return scores
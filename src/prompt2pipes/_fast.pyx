@@ -0,0 +1,57 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Compiled twin of runner._chunk_text, built only with PROMPT2PIPES_ENABLE_SPEEDUPS=1.
+
+Scans characters directly instead of running the token regex; the token
+alphabet ([A-Za-z0-9']) and the windowing must stay in sync with runner.py.
+"""
+from libc.stdlib cimport malloc, free
+
+cdef inline bint _is_token_char(Py_UCS4 c):
+    return (u'a' <= c <= u'z') or (u'A' <= c <= u'Z') or (u'0' <= c <= u'9') or c == u"'"
+
+def chunk_text(str text, Py_ssize_t chunk_size, Py_ssize_t overlap):
+    cdef Py_ssize_t n = len(text)
+    cdef Py_ssize_t i = 0, start, nw, end, step, pos
+    cdef list words = []
+    while i < n:
+        if _is_token_char(text[i]):
+            start = i
+            while i < n and _is_token_char(text[i]):
+                i += 1
+            words.append(text[start:i])
+        else:
+            i += 1
+    nw = len(words)
+    if nw == 0:
+        return []
+
+    cdef str joined = " ".join(words)
+    cdef Py_ssize_t* starts = <Py_ssize_t*> malloc((nw + 1) * sizeof(Py_ssize_t))
+    if starts == NULL:
+        raise MemoryError()
+    cdef list out = []
+    try:
+        pos = 0
+        for i in range(nw):
+            starts[i] = pos
+            pos += len(<str> words[i]) + 1
+        starts[nw] = pos
+
+        if chunk_size < 1:
+            chunk_size = 1
+        step = chunk_size - overlap
+        if step < 1:
+            step = 1
+        i = 0
+        # step can exceed chunk_size (negative overlap); never index starts past nw
+        while i < nw:
+            end = i + chunk_size
+            if end > nw:
+                end = nw
+            out.append(joined[starts[i]:starts[end] - 1])
+            if end == nw:
+                break
+            i += step
+        return out
+    finally:
+        free(starts)
@@ -5,9 +5,7 @@ from rich.panel import Panel
 from rich.table import Table
 from typing import Optional
 
-from .generator import generate_graph_from_task, save_graph_yaml
-from .validator import validate_graph_from_file
-from .visualize import ascii_plan
+# Pipeline modules are imported inside each command so `--help`/`init` stay fast.
 
 app = typer.Typer(no_args_is_help=True, help="Prompt2Pipes CLI — natural language → NLP pipelines")
 
@@ -24,6 +22,7 @@ def generate(task: str = typer.Option(..., help="Template to use: ner | rag-bm25
              outdir: Path = typer.Option(Path("pipelines"), help="Where to place the YAML"),
     ):
     """Generate a pipeline YAML from a known template."""
+    from .generator import generate_graph_from_task, save_graph_yaml
     graph = generate_graph_from_task(task)
     outdir.mkdir(exist_ok=True, parents=True)
     outfile = outdir / f"{name}.yaml"
@@ -33,6 +32,7 @@ def generate(task: str = typer.Option(..., help="Template to use: ner | rag-bm25
 @app.command()
 def validate(file: Path):
     """Validate a pipeline YAML (structure, nodes/edges, cycles)."""
+    from .validator import validate_graph_from_file
     ok, messages = validate_graph_from_file(file)
     table = Table(title="Validation Report", show_lines=True)
     table.add_column("Status", justify="center", style="bold")
@@ -47,6 +47,7 @@ def validate(file: Path):
 @app.command()
 def explain(file: Path):
     """Print an ASCII plan of the pipeline graph."""
+    from .visualize import ascii_plan
     print(ascii_plan(file))
 
 @app.command()
@@ -1,30 +1,159 @@
 from __future__ import annotations
-from pydantic import BaseModel, Field
-from typing import Dict, List, Optional, Any
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Any, Tuple
+import os
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+import yaml
 
-class Node(BaseModel):
+try:  # libyaml bindings are several times faster than the pure-Python loader
+    from yaml import CSafeLoader as _SafeLoader, CSafeDumper as _SafeDumper
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader, SafeDumper as _SafeDumper
+
+def load_yaml(text: str) -> Any:
+    return yaml.load(text, Loader=_SafeLoader)
+
+def dump_yaml(data: Any) -> str:
+    return yaml.dump(data, Dumper=_SafeDumper, sort_keys=False)
+
+def _mapping(d: Any, what: str, required: tuple = ()) -> Dict[str, Any]:
+    if d is None:
+        d = {}
+    if not isinstance(d, dict):
+        raise ValueError(f"{what}: expected a mapping, got {type(d).__name__}")
+    missing = [k for k in required if k not in d]
+    if missing:
+        raise ValueError(f"{what}: missing field(s) {', '.join(missing)}")
+    return d
+
+def _str_map(d: Any, what: str) -> Dict[str, str]:
+    return {str(k): str(v) for k, v in _mapping(d, what).items()}
+
+@dataclass(slots=True)
+class Node:
     id: str
     component: str
-    inputs: Dict[str, str] = Field(default_factory=dict)   # name -> type
-    outputs: Dict[str, str] = Field(default_factory=dict)  # name -> type
-    params: Dict[str, Any] = Field(default_factory=dict)
+    inputs: Dict[str, str] = field(default_factory=dict)   # name -> type
+    outputs: Dict[str, str] = field(default_factory=dict)  # name -> type
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, d: Any) -> "Node":
+        d = _mapping(d, "node", ("id", "component"))
+        return cls(id=str(d["id"]), component=str(d["component"]),
+                   inputs=_str_map(d.get("inputs"), f"node {d['id']}: inputs"),
+                   outputs=_str_map(d.get("outputs"), f"node {d['id']}: outputs"),
+                   params=dict(_mapping(d.get("params"), f"node {d['id']}: params")))
 
-class Edge(BaseModel):
+@dataclass(slots=True)
+class Edge:
     source: str
     source_output: str
     target: str
     target_input: str
 
-class Graph(BaseModel):
+    @classmethod
+    def from_dict(cls, d: Any) -> "Edge":
+        d = _mapping(d, "edge", ("source", "source_output", "target", "target_input"))
+        return cls(source=str(d["source"]), source_output=str(d["source_output"]),
+                   target=str(d["target"]), target_input=str(d["target_input"]))
+
+class _NodeMapSlot:
+    # Holds Graph's node_map cache outside the dataclass fields, so asdict/eq/repr skip it
+    __slots__ = ("_node_map",)
+
+@dataclass(slots=True)
+class Graph(_NodeMapSlot):
     nodes: List[Node]
     edges: List[Edge]
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        # object.__setattr__ rather than super(): zero-arg super() breaks in slots dataclasses
+        object.__setattr__(self, name, value)
+        if name == "nodes":
+            object.__setattr__(self, "_node_map", None)
+
+    @classmethod
+    def from_dict(cls, d: Any) -> "Graph":
+        """Build a Graph from parsed YAML; raises ValueError on malformed input."""
+        d = _mapping(d, "graph", ("nodes", "edges"))
+        nodes, edges = d["nodes"] or [], d["edges"] or []
+        if not isinstance(nodes, list) or not isinstance(edges, list):
+            raise ValueError("graph: nodes and edges must be lists")
+        return cls(nodes=[Node.from_dict(n) for n in nodes],
+                   edges=[Edge.from_dict(e) for e in edges],
+                   metadata=dict(_mapping(d.get("metadata"), "graph: metadata")))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"nodes": [asdict(n) for n in self.nodes],
+                "edges": [asdict(e) for e in self.edges],
+                "metadata": dict(self.metadata)}
+
+    model_dump = to_dict  # pre-dataclass name
 
     def node_map(self) -> Dict[str, Node]:
-        return {n.id: n for n in self.nodes}
+        # Cached; reset by __setattr__ (nodes is assigned in __init__ too).
+        # In-place edits of `nodes` (append/remove) are not tracked.
+        if self._node_map is None:
+            self._node_map = {n.id: n for n in self.nodes}
+        return self._node_map
 
     def outputs_of(self, node_id: str) -> Dict[str, str]:
         return self.node_map()[node_id].outputs
 
     def inputs_of(self, node_id: str) -> Dict[str, str]:
         return self.node_map()[node_id].inputs
+
+@lru_cache(maxsize=32)
+def _load_graph_cached(path_str: str, mtime_ns: int, size: int) -> Graph:
+    # mtime/size are only part of the cache key, so an edited file misses the cache
+    return Graph.from_dict(load_yaml(Path(path_str).read_text()))
+
+def load_graph(path: Path) -> Graph:
+    """Parse and validate a pipeline YAML, reusing the result while the file is unchanged.
+
+    The returned Graph is shared between callers; treat it as read-only.
+    """
+    st = os.stat(path)
+    return _load_graph_cached(str(Path(path).resolve()), st.st_mtime_ns, st.st_size)
+
+class CycleError(ValueError):
+    """Raised when a pipeline graph is not a DAG."""
+
+Inbound = Dict[str, Dict[str, Tuple[str, str]]]  # target -> target_input -> (source, source_output)
+
+def plan(g: Graph) -> Tuple[List[str], Inbound]:
+    """Topological order (Kahn's; ties keep declaration order) plus each node's inbound ports.
+
+    Both come out of the same single pass over the edges. For a repeated
+    target_input the first edge wins.
+    """
+    indeg: Dict[str, int] = {n.id: 0 for n in g.nodes}
+    succ: Dict[str, List[str]] = {nid: [] for nid in indeg}
+    inbound: Inbound = {nid: {} for nid in indeg}
+    for e in g.edges:
+        # Edges with either end undeclared are skipped entirely; the validator reports them
+        if e.source not in indeg or e.target not in indeg:
+            continue
+        inbound[e.target].setdefault(e.target_input, (e.source, e.source_output))
+        succ[e.source].append(e.target)
+        indeg[e.target] += 1
+
+    ready = deque(nid for nid, d in indeg.items() if d == 0)
+    order: List[str] = []
+    while ready:
+        nid = ready.popleft()
+        order.append(nid)
+        for t in succ[nid]:
+            indeg[t] -= 1
+            if indeg[t] == 0:
+                ready.append(t)
+    if len(order) != len(indeg):
+        raise CycleError("Cycle detected in the graph.")
+    return order, inbound
+
+def topo_order(g: Graph) -> List[str]:
+    return plan(g)[0]
@@ -1,22 +1,25 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Tuple
-import yaml
-import networkx as nx
+from typing import Callable, Dict, Any, Optional, List, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import os, json, re
+import functools
+import itertools
+import numpy as np
 
-from .ir import Graph
+from .ir import CycleError, Node, load_graph, plan
 
-def _topo_order(g: Graph) -> List[str]:
-    nxg = nx.DiGraph()
-    nxg.add_nodes_from([n.id for n in g.nodes])
-    for e in g.edges:
-        nxg.add_edge(e.source, e.target)
-    return list(nx.topological_sort(nxg))
+try:  # optional: C-backed JSON encoding for large artifacts
+    import orjson
+except ImportError:
+    orjson = None
 
-def _load_graph(path: Path) -> Graph:
-    data = yaml.safe_load(path.read_text())
-    return Graph(**data)
+def _write_json(path: Path, data: Any) -> None:
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
 
 def _read_text_fallback(text: Optional[str], text_file: Optional[Path]) -> str:
     if text is not None:
@@ -28,224 +31,296 @@ def _read_text_fallback(text: Optional[str], text_file: Optional[Path]) -> str:
 def _read_query_fallback(query: Optional[str]) -> str:
     return query or "What is Apple doing in Mumbai?"
 
-_word_re = re.compile(r"[A-Za-z']+")
+# Shared by chunking and BM25 tokenization
+_TOKEN_RE = re.compile(r"[A-Za-z0-9']+")
 
 def _chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
-    words = _word_re.findall(text)
+    words = _TOKEN_RE.findall(text)
+    if not words:
+        return []
+    # Join once and slice chunks out by word offsets instead of joining each window
+    joined = " ".join(words)
+    starts = [0, *itertools.accumulate(len(w) + 1 for w in words)]
+    n = len(words)
+    chunk_size = max(1, chunk_size)
+    step = max(1, chunk_size - overlap)
     out = []
     i = 0
-    while i < len(words):
-        chunk = words[i:i+chunk_size]
-        out.append(" ".join(chunk))
-        i += max(1, chunk_size - overlap)
+    # step can exceed chunk_size (negative overlap), so i may jump past the end
+    while i < n:
+        end = min(i + chunk_size, n)
+        out.append(joined[starts[i]:starts[end] - 1])
+        # Stop once a window reaches the end; further windows would be pure overlap
+        if end == n:
+            break
+        i += step
     return out
 
+try:  # compiled version, built when PROMPT2PIPES_ENABLE_SPEEDUPS=1 (see setup.py)
+    from ._fast import chunk_text as _chunk_text
+except ImportError:
+    pass
+
+# Default for SpaCyModel's `exclude` param: keep only what `ents` needs (tok2vec/transformer
+# stay since ner may listen to them). The emitted `doc` then has no sentences, tags or lemmas;
+# set `exclude: []` on the node when a downstream consumer needs the full pipeline.
+_SPACY_NER_EXCLUDE = ("tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer")
+
+@functools.lru_cache(maxsize=4)
+def _load_spacy(name: str, exclude: Tuple[str, ...] = _SPACY_NER_EXCLUDE):
+    # Loading a model takes hundreds of ms; reuse it across nodes and runs in this process.
+    import spacy
+    return spacy.load(name, exclude=list(exclude))
+
 class _BM25Index:
-    def __init__(self, texts: List[str]):
-        from rank_bm25 import BM25Okapi
-        tokenized = [t.lower().split() for t in texts]
+    def __init__(self, texts: List[str], docs: Optional[List[str]] = None,
+                 chunk_ids: Optional[List[int]] = None):
+        from ._bm25 import BM25Okapi
+        tokenized = [_TOKEN_RE.findall(t.lower()) for t in texts]
         self.texts = texts
+        # References to the splitter's parallel arrays, so hit positions map back to sources
+        self.docs = docs
+        self.chunk_ids = chunk_ids
         self.model = BM25Okapi(tokenized)
         self.tokenized = tokenized
 
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def tokenize(query: str) -> Tuple[str, ...]:
+        return tuple(_TOKEN_RE.findall(query.lower()))
+
     def search(self, query: str, top_k: int = 3) -> List[Tuple[int, float]]:
-        scores = self.model.get_scores(query.lower().split())
-        idx_scores = list(enumerate(scores))
-        idx_scores.sort(key=lambda x: x[1], reverse=True)
-        return idx_scores[:top_k]
+        return self.search_tokens(self.tokenize(query), top_k)
 
-def _load_docs_from_folder(path: Path) -> List[Tuple[str, str]]:
-    docs = []
-    path = Path(path)
-    if not path.exists():
-        return docs
+    def search_tokens(self, tokens: Sequence[str], top_k: int = 3) -> List[Tuple[int, float]]:
+        scores = self.model.get_scores(tokens)
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        # k-th best score in O(n); ties at that score go to the earliest chunks,
+        # matching the old stable full sort
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        above = np.flatnonzero(scores > kth)
+        top = np.concatenate((above, np.flatnonzero(scores == kth)[:k - len(above)]))
+        order = top[np.lexsort((top, -scores[top]))]
+        return [(int(i), float(scores[i])) for i in order]
 
-    # PDFs
-    for p in sorted(path.glob("*.pdf")):
+def _read_one(entry: os.DirEntry, pdf_reader: Any) -> Optional[Tuple[str, str]]:
+    if entry.name.lower().endswith(".pdf"):
         try:
-            from pypdf import PdfReader
-            reader = PdfReader(str(p))
-            text = "".join(page.extract_text() or "" for page in reader.pages)
-            if text.strip():
-                docs.append((p.name, text))
+            reader = pdf_reader(entry.path, strict=False)
+            parts = []
+            for page in reader.pages:
+                t = page.extract_text()
+                if t:
+                    parts.append(t)
+            text = "\n".join(parts)
         except Exception as e:
-            print(f"[runner] Warning: could not read PDF {p.name}: {e}")
+            print(f"[runner] Warning: could not read PDF {entry.name}: {e}")
+            return None
+        return (entry.name, text) if text.strip() else None
+    try:
+        return entry.name, Path(entry.path).read_bytes().decode("utf-8", "replace")
+    except Exception as e:
+        print(f"[runner] Warning: could not read TXT {entry.name}: {e}")
+        return None
 
-    # TXTs
-    for p in sorted(path.glob("*.txt")):
+def _load_docs_from_folder(path: Path) -> List[Tuple[str, str]]:
+    path = Path(path)
+    if not path.is_dir():
+        return []
+
+    # One directory pass for both kinds instead of a glob per suffix
+    pdfs, txts = [], []
+    with os.scandir(path) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            name = entry.name.lower()
+            if name.endswith(".pdf"):
+                pdfs.append(entry)
+            elif name.endswith(".txt"):
+                txts.append(entry)
+
+    pdf_reader = None
+    if pdfs:
         try:
-            docs.append((p.name, p.read_text()))
-        except Exception as e:
-            print(f"[runner] Warning: could not read TXT {p.name}: {e}")
+            from pypdf import PdfReader as pdf_reader
+        except ImportError as e:
+            print(f"[runner] Warning: pypdf not installed, skipping PDFs: {e}")
+            pdfs = []
+
+    entries = sorted(pdfs + txts, key=lambda en: en.name)
+    if len(entries) <= 1:
+        results = [_read_one(en, pdf_reader) for en in entries]
+    else:
+        # pypdf page decoding and file reads overlap well across threads; map keeps name order
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1, len(entries))) as ex:
+            results = list(ex.map(lambda en: _read_one(en, pdf_reader), entries))
+    return [r for r in results if r is not None]
+
+class _RunError(Exception):
+    """Raised by a handler to stop the run; the message is printed with the [runner] prefix."""
+
+def _first(inbound: Dict[str, Any]) -> Any:
+    # Single-input sinks accept whichever port feeds them
+    return next(iter(inbound.values()), None)
+
+def _h_input_text(node, inbound, ctx):
+    return {"text": _read_text_fallback(ctx["text"], ctx["text_file"])}
+
+def _h_spacy(node, inbound, ctx):
+    inbound_text = inbound.get("text")
+    if inbound_text is None:
+        raise _RunError(f"No inbound text for SpaCyModel at node '{node.id}'.")
+
+    model_name = node.params.get("model", "en_core_web_sm")
+    exclude = node.params.get("exclude", _SPACY_NER_EXCLUDE)
+    if exclude is None:
+        exclude = ()
+    if not isinstance(exclude, (list, tuple)) or not all(isinstance(x, str) for x in exclude):
+        raise _RunError(f"SpaCyModel at '{node.id}': params.exclude must be a list of component names, "
+                        f"got {exclude!r}.")
+    exclude = tuple(exclude)
+    try:
+        nlp = _load_spacy(model_name, exclude)
+    except ImportError as ie:
+        raise _RunError("spaCy not installed. Try: pip install spacy && python -m spacy download en_core_web_sm\n"
+                        f"[runner] Underlying error: {ie}")
+    except Exception as me:
+        raise _RunError(f"Could not load spaCy model '{model_name}'. Install with: python -m spacy download en_core_web_sm\n"
+                        f"         Underlying error: {me}")
+
+    doc = nlp(inbound_text)
+    ents = [(ent.text, ent.label_) for ent in doc.ents]
+    return {"doc": doc, "ents": ents}
+
+def _h_console_printer(node, inbound, ctx):
+    data = _first(inbound)
+    if data is None:
+        raise _RunError(f"ConsolePrinter at '{node.id}' has no inbound data.")
+
+    print("=== ConsolePrinter ===")
+    if isinstance(data, list):
+        for i, it in enumerate(data, 1):
+            print(f"{i:02d}. {it}")
+    else:
+        print(data)
+    return {}
+
+def _h_pdf_loader(node, inbound, ctx):
+    folder = Path(node.params.get("path", ctx["docs_path"] or "data/docs"))
+    docs = _load_docs_from_folder(folder)
+    if not docs:
+        print(f"[runner] No documents found in '{folder}'. Place .pdf or .txt files there.")
+    return {"docs": docs}
+
+def _h_text_splitter(node, inbound, ctx):
+    inbound_docs = inbound.get("docs")
+    if inbound_docs is None:
+        raise _RunError(f"TextSplitter at '{node.id}' missing inbound docs.")
+    chunk_size = int(node.params.get("chunk_size", 512))
+    overlap = int(node.params.get("overlap", 64))
+    # Parallel lists (one entry per chunk) so BM25 can index "texts" as-is
+    texts: List[str] = []
+    doc_names: List[str] = []
+    chunk_ids: List[int] = []
+    for name, text in inbound_docs:
+        pieces = _chunk_text(text, chunk_size=chunk_size, overlap=overlap)
+        texts.extend(pieces)
+        doc_names.extend([name] * len(pieces))
+        chunk_ids.extend(range(len(pieces)))
+    return {"chunks": {"texts": texts, "docs": doc_names, "chunk_ids": chunk_ids}}
+
+def _h_bm25_index(node, inbound, ctx):
+    inbound_chunks = inbound.get("docs")
+    if inbound_chunks is None:
+        raise _RunError(f"BM25Index at '{node.id}' missing inbound chunks.")
+    index = _BM25Index(inbound_chunks["texts"], inbound_chunks["docs"], inbound_chunks["chunk_ids"])
+    return {"index": index, "chunks": inbound_chunks}
+
+def _h_input_query(node, inbound, ctx):
+    return {"query": _read_query_fallback(ctx["query"])}
+
+def _h_bm25_retriever(node, inbound, ctx):
+    inbound_query = inbound.get("query")
+    inbound_index = inbound.get("index")
+    if inbound_query is None or inbound_index is None:
+        raise _RunError(f"BM25Retriever at '{node.id}' missing query or index.")
+    tk = int(node.params.get("top_k", ctx["top_k"]))
+    hits_idx = inbound_index.search(inbound_query, top_k=tk)
+    texts, doc_names, chunk_ids = inbound_index.texts, inbound_index.docs, inbound_index.chunk_ids
+    hits = [{"text": texts[i], "score": score, "doc": doc_names[i], "chunk_id": chunk_ids[i]}
+            for i, score in hits_idx]
+    return {"hits": hits}
+
+def _h_llm_reader(node, inbound, ctx):
+    inbound_ctx = inbound.get("context")
+    inbound_q = inbound.get("question")
+    if not inbound_ctx:
+        raise _RunError(f"LLMReader at '{node.id}' missing context.")
+    top = inbound_ctx[0]
+    answer = f"Top passage from {top['doc']} (chunk {top['chunk_id']}):\n" + top["text"]
+    if inbound_q:
+        answer = "Q: " + inbound_q + "\n" + answer
+    return {"answer": answer}
 
-    return docs
+def _h_console_json_writer(node, inbound, ctx):
+    data = _first(inbound)
+    if data is None:
+        raise _RunError(f"ConsoleJSONWriter at '{node.id}' has no inbound data.")
+    os.makedirs("artifacts", exist_ok=True)
+    out_path = Path("artifacts") / f"{node.id}.json"
+    _write_json(out_path, data)
+    print(f"[runner] Wrote JSON to {out_path}")
+    return {}
+
+# component name -> handler(node, inbound, ctx) returning the node's output values.
+# `inbound` maps each connected input name to its already-computed upstream value.
+HANDLERS: Dict[str, Callable[[Node, Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = {
+    "InputText": _h_input_text,
+    "SpaCyModel": _h_spacy,
+    "ConsolePrinter": _h_console_printer,
+    "PDFLoader": _h_pdf_loader,
+    "TextSplitter": _h_text_splitter,
+    "BM25Index": _h_bm25_index,
+    "InputQuery": _h_input_query,
+    "BM25Retriever": _h_bm25_retriever,
+    "LLMReader": _h_llm_reader,
+    "ConsoleJSONWriter": _h_console_json_writer,
+}
 
 def run_graph(file: Path, *, text: Optional[str] = None, text_file: Optional[Path] = None,
               query: Optional[str] = None, docs_path: Optional[Path] = None, top_k: int = 3) -> bool:
     try:
-        g = _load_graph(file)
+        g = load_graph(file)
     except Exception as e:
         print(f"[runner] Failed to load graph: {e}")
         return False
 
+    try:
+        order, inbound = plan(g)
+    except CycleError as e:
+        print(f"[runner] {e}")
+        return False
+
+    ctx = {"text": text, "text_file": text_file, "query": query, "docs_path": docs_path, "top_k": top_k}
     values: Dict[str, Dict[str, Any]] = {}
-    order = _topo_order(g)
-    node_map = {n.id: n for n in g.nodes}
+    node_map = g.node_map()
 
     for nid in order:
         node = node_map[nid]
-        comp = node.component
-
-        if comp == "InputText":
-            txt = _read_text_fallback(text, text_file)
-            values[nid] = {"text": txt}
-
-        elif comp == "SpaCyModel":
-            inbound_text = None
-            for e in g.edges:
-                if e.target == nid and e.target_input == "text":
-                    inbound_text = values[e.source].get(e.source_output)
-                    break
-            if inbound_text is None:
-                print(f"[runner] No inbound text for SpaCyModel at node '{nid}'.")
-                return False
-
-            model_name = node.params.get("model", "en_core_web_sm")
-            try:
-                import spacy
-            except Exception as ie:
-                print("[runner] spaCy not installed. Try: pip install spacy && python -m spacy download en_core_web_sm")
-                print(f"[runner] Underlying error: {ie}")
-                return False
-            try:
-                nlp = spacy.load(model_name)
-            except Exception as me:
-                print(f"[runner] Could not load spaCy model '{model_name}'. Install with: python -m spacy download en_core_web_sm")
-                print(f"         Underlying error: {me}")
-                return False
-
-            doc = nlp(inbound_text)
-            ents = [(ent.text, ent.label_) for ent in doc.ents]
-            values[nid] = {"doc": doc, "ents": ents}
-
-        elif comp == "ConsolePrinter":
-            inbound = None
-            for e in g.edges:
-                if e.target == nid:
-                    inbound = values[e.source].get(e.source_output)
-                    break
-            if inbound is None:
-                print(f"[runner] ConsolePrinter at '{nid}' has no inbound data.")
-                return False
-
-            print("=== ConsolePrinter ===")
-            if isinstance(inbound, list):
-                for i, it in enumerate(inbound, 1):
-                    print(f"{i:02d}. {it}")
-            else:
-                print(inbound)
-            values[nid] = {}
-
-        elif comp == "PDFLoader":
-            folder = Path(node.params.get("path", docs_path or "data/docs"))
-            docs = _load_docs_from_folder(folder)
-            if not docs:
-                print(f"[runner] No documents found in '{folder}'. Place .pdf or .txt files there.")
-            values[nid] = {"docs": docs}
-
-        elif comp == "TextSplitter":
-            inbound_docs = None
-            for e in g.edges:
-                if e.target == nid and e.target_input == "docs":
-                    inbound_docs = values[e.source].get(e.source_output)
-                    break
-            if inbound_docs is None:
-                print(f"[runner] TextSplitter at '{nid}' missing inbound docs.")
-                return False
-            chunk_size = int(node.params.get("chunk_size", 512))
-            overlap = int(node.params.get("overlap", 64))
-            chunks = []
-            for name, text in inbound_docs:
-                pieces = _chunk_text(text, chunk_size=chunk_size, overlap=overlap)
-                for i, ch in enumerate(pieces):
-                    chunks.append({"doc": name, "chunk_id": i, "text": ch})
-            values[nid] = {"chunks": chunks}
-
-        elif comp == "BM25Index":
-            inbound_chunks = None
-            for e in g.edges:
-                if e.target == nid and e.target_input == "docs":
-                    inbound_chunks = values[e.source].get(e.source_output)
-                    break
-            if inbound_chunks is None:
-                print(f"[runner] BM25Index at '{nid}' missing inbound chunks.")
-                return False
-            texts = [c["text"] for c in inbound_chunks]
-            index = _BM25Index(texts)
-            values[nid] = {"index": index, "chunks": inbound_chunks}
-
-        elif comp == "InputQuery":
-            q = _read_query_fallback(query)
-            values[nid] = {"query": q}
-
-        elif comp == "BM25Retriever":
-            inbound_query = None
-            inbound_index = None
-            inbound_chunks = None
-            for e in g.edges:
-                if e.target == nid and e.target_input == "query":
-                    inbound_query = values[e.source].get(e.source_output)
-                if e.target == nid and e.target_input == "index":
-                    inbound_index = values[e.source].get(e.source_output)
-                    if "chunks" in values[e.source]:
-                        inbound_chunks = values[e.source]["chunks"]
-            if inbound_query is None or inbound_index is None:
-                print(f"[runner] BM25Retriever at '{nid}' missing query or index.")
-                return False
-            tk = int(node.params.get("top_k", top_k))
-            hits_idx = inbound_index.search(inbound_query, top_k=tk)
-            hits = []
-            for idx, score in hits_idx:
-                ch = inbound_chunks[idx]
-                hits.append({"text": ch["text"], "score": float(score), "doc": ch["doc"], "chunk_id": ch["chunk_id"]})
-            values[nid] = {"hits": hits}
-
-        elif comp == "LLMReader":
-            inbound_ctx = None
-            inbound_q = None
-            for e in g.edges:
-                if e.target == nid and e.target_input == "context":
-                    inbound_ctx = values[e.source].get(e.source_output)
-                if e.target == nid and e.target_input == "question":
-                    inbound_q = values[e.source].get(e.source_output)
-            if not inbound_ctx:
-                print(f"[runner] LLMReader at '{nid}' missing context.")
-                return False
-            top = inbound_ctx[0]
-            answer = f"Top passage from {top['doc']} (chunk {top['chunk_id']}):\n" + top["text"]
-            if inbound_q:
-                answer = "Q: " + inbound_q + "\n" + answer
-            values[nid] = {"answer": answer}
-
-        elif comp == "ConsoleJSONWriter":
-            inbound = None
-            for e in g.edges:
-                if e.target == nid:
-                    inbound = values[e.source].get(e.source_output)
-                    break
-            if inbound is None:
-                print(f"[runner] ConsoleJSONWriter at '{nid}' has no inbound data.")
-                return False
-            os.makedirs("artifacts", exist_ok=True)
-            out_path = Path("artifacts") / f"{nid}.json"
-            with open(out_path, "w") as f:
-                json.dump(inbound, f, indent=2)
-            print(f"[runner] Wrote JSON to {out_path}")
-            values[nid] = {}
-
-        else:
-            print(f"[runner] Component '{comp}' not implemented yet. Skipping node '{nid}'.")
+        handler = HANDLERS.get(node.component)
+        if handler is None:
+            print(f"[runner] Component '{node.component}' not implemented yet. Skipping node '{nid}'.")
             values[nid] = {}
+            continue
+        node_inbound = {name: values[src].get(out) for name, (src, out) in inbound[nid].items()}
+        try:
+            values[nid] = handler(node, node_inbound, ctx)
+        except _RunError as e:
+            print(f"[runner] {e}")
+            return False
 
     print("[runner] Done.")
     return True
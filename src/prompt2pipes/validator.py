@@ -1,17 +1,11 @@
 from pathlib import Path
-import yaml
-import networkx as nx
 from typing import Tuple, List
-from .ir import Graph
-
-def _load_graph(path: Path) -> Graph:
-    data = yaml.safe_load(path.read_text())
-    return Graph(**data)
+from .ir import CycleError, load_graph, topo_order
 
 def validate_graph_from_file(path: Path) -> Tuple[bool, List[str]]:
     messages: List[str] = []
     ok = True
-    g = _load_graph(path)
+    g = load_graph(path)
 
     node_ids = {n.id for n in g.nodes}
     # 1) Unique node ids
@@ -21,37 +15,37 @@ def validate_graph_from_file(path: Path) -> Tuple[bool, List[str]]:
     else:
         messages.append("OK: Node IDs are unique.")
 
-    # 2) Edges refer to existing nodes
+    # 2) + 3) One pass over edges: endpoints exist, and name a declared output/input
+    endpoints = {n.id: (n.outputs.keys(), n.inputs.keys()) for n in g.nodes}
+    missing: List[str] = []
+    ports: List[str] = []
     for e in g.edges:
-        if e.source not in node_ids or e.target not in node_ids:
-            ok = False
-            messages.append(f"ERR: Edge {e.source}->{e.target} references missing node(s)." )
+        src = endpoints.get(e.source)
+        dst = endpoints.get(e.target)
+        if src is None or dst is None:
+            missing.append(f"ERR: Edge {e.source}->{e.target} references missing node(s)." )
+            continue
+        if e.source_output not in src[0]:
+            ports.append(f"ERR: Edge from {e.source}.{e.source_output} not an output on that node.")
+        if e.target_input not in dst[1]:
+            ports.append(f"ERR: Edge to {e.target}.{e.target_input} not an input on that node.")
+
+    if missing:
+        ok = False
+        messages.extend(missing)
     if ok:
         messages.append("OK: All edges reference existing nodes.")
-
-    # 3) Outputs/inputs exist
-    node_map = {n.id: n for n in g.nodes}
-    for e in g.edges:
-        so = node_map[e.source].outputs
-        ti = node_map[e.target].inputs
-        if e.source_output not in so:
-            ok = False
-            messages.append(f"ERR: Edge from {e.source}.{e.source_output} not an output on that node.")
-        if e.target_input not in ti:
-            ok = False
-            messages.append(f"ERR: Edge to {e.target}.{e.target_input} not an input on that node.")
+    if ports:
+        ok = False
+        messages.extend(ports)
     if ok:
         messages.append("OK: All edge endpoints correspond to declared inputs/outputs.")
 
     # 4) Acyclic check
-    nxg = nx.DiGraph()
-    nxg.add_nodes_from(node_ids)
-    for e in g.edges:
-        nxg.add_edge(e.source, e.target)
     try:
-        list(nx.topological_sort(nxg))
+        topo_order(g)
         messages.append("OK: Graph is acyclic.")
-    except nx.NetworkXUnfeasible:
+    except CycleError:
         ok = False
         messages.append("ERR: Cycle detected in the graph.")
 
@@ -1,22 +1,19 @@
 from pathlib import Path
-import yaml
-import networkx as nx
-from .ir import Graph
+from typing import Dict, List
+from .ir import load_graph, topo_order
 
 def ascii_plan(path: Path) -> str:
-    data = yaml.safe_load(path.read_text())
-    g = Graph(**data)
-    nxg = nx.DiGraph()
-    nxg.add_nodes_from([n.id for n in g.nodes])
+    g = load_graph(path)
+    # Successor lines are formatted once, in the same pass that builds the adjacency
+    adj: Dict[str, List[str]] = {}
     for e in g.edges:
-        nxg.add_edge(e.source, e.target, label=f"{e.source_output}->{e.target_input}")
+        adj.setdefault(e.source, []).append(f"    └─▶ {e.target}  ({e.source_output}->{e.target_input})")
 
-    order = list(nx.topological_sort(nxg))
+    order = topo_order(g)
+    nmap = g.node_map()
     lines = ["# ASCII Plan (topological order)"]
     for i, nid in enumerate(order, 1):
-        node = next(n for n in g.nodes if n.id == nid)
+        node = nmap[nid]
         lines.append(f"{i:02d}. {node.id} [{node.component}]")
-        for succ in nxg.successors(nid):
-            elabel = nxg.get_edge_data(nid, succ)['label']
-            lines.append(f"    └─▶ {succ}  ({elabel})")
+        lines.extend(adj.get(nid, []))
     return "\n".join(lines)
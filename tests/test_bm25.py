@@ -0,0 +1,27 @@
+import pytest
+from prompt2pipes._bm25 import BM25Okapi
+
+def test_scores_rank_matching_docs_first():
+    corpus = [["apple", "mumbai", "office"], ["cricket", "mumbai"], ["delhi", "metro", "rail"]]
+    scores = BM25Okapi(corpus).get_scores(["apple", "office"])
+    assert scores.argmax() == 0
+    assert scores[2] == 0.0
+
+def test_scores_match_rank_bm25_including_floored_idf():
+    # "mumbai" is in 3 of 4 docs, so its raw idf is negative and gets floored to
+    # epsilon * mean(idf); "apple" (2 of 4) has idf exactly 0.
+    corpus = [["mumbai", "apple", "office"], ["mumbai", "cricket"],
+              ["mumbai", "delhi", "apple", "apple"], ["metro"]]
+    model = BM25Okapi(corpus)
+    assert model.idf[model.vocab["mumbai"]] == pytest.approx(0.10591223254840047)
+    assert model.idf[model.vocab["apple"]] == 0.0
+    # Reference values from rank_bm25 0.2.2 BM25Okapi(corpus).get_scores(...)
+    expected = [0.09716718582422064, 0.11638706873450602, 0.08339545869952794, 0.0]
+    assert model.get_scores(["mumbai", "apple"]).tolist() == pytest.approx(expected)
+    assert model.get_scores(["mumbai"]).tolist() == pytest.approx(expected)
+
+def test_empty_corpora_score_to_empty_or_zero():
+    # rank_bm25 raised ZeroDivisionError for both of these
+    assert BM25Okapi([]).get_scores(["apple"]).tolist() == []
+    assert BM25Okapi([[]]).get_scores(["apple"]).tolist() == [0.0]
+    assert BM25Okapi([[], []]).get_scores([]).tolist() == [0.0, 0.0]
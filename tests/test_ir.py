@@ -1,4 +1,7 @@
+from dataclasses import asdict
 from pathlib import Path
+import pytest
+from prompt2pipes.ir import CycleError, Edge, Graph, Node, load_graph, topo_order
 from prompt2pipes.generator import generate_graph_from_task, save_graph_yaml
 from prompt2pipes.validator import validate_graph_from_file
 
@@ -8,3 +11,51 @@ def test_generate_and_validate(tmp_path: Path):
     save_graph_yaml(g, path)
     ok, messages = validate_graph_from_file(path)
     assert ok, messages
+
+def test_topo_order_rejects_cycles():
+    g = Graph(
+        nodes=[Node(id="a", component="X"), Node(id="b", component="X")],
+        edges=[Edge(source="a", source_output="o", target="b", target_input="i"),
+               Edge(source="b", source_output="o", target="a", target_input="i")],
+    )
+    with pytest.raises(CycleError):
+        topo_order(g)
+
+def test_load_graph_reuses_until_file_changes(tmp_path: Path):
+    path = tmp_path / "ner.yaml"
+    g = generate_graph_from_task("ner")
+    save_graph_yaml(g, path)
+    first = load_graph(path)
+    assert load_graph(path) is first
+    g.metadata["note"] = "edited"
+    save_graph_yaml(g, path)
+    assert load_graph(path).metadata["note"] == "edited"
+
+def test_validate_reports_dangling_edges(tmp_path: Path):
+    g = generate_graph_from_task("ner")
+    g.edges.append(Edge(source="nlp", source_output="ents", target="ghost", target_input="items"))
+    path = tmp_path / "ner.yaml"
+    save_graph_yaml(g, path)
+    ok, messages = validate_graph_from_file(path)
+    assert not ok
+    assert "ERR: Edge nlp->ghost references missing node(s)." in messages
+
+def test_graph_asdict_excludes_node_map_cache():
+    g = generate_graph_from_task("ner")
+    g.node_map()
+    assert set(asdict(g)) == {"nodes", "edges", "metadata"}
+    assert asdict(g) == g.to_dict()
+    g.nodes = g.nodes[:1]
+    assert list(g.node_map()) == ["text_source"]
+
+def test_validate_reports_undeclared_ports(tmp_path: Path):
+    g = generate_graph_from_task("ner")
+    g.edges[0].source_output = "txt"
+    g.edges[1].target_input = "entities"
+    path = tmp_path / "ner.yaml"
+    save_graph_yaml(g, path)
+    ok, messages = validate_graph_from_file(path)
+    assert not ok
+    assert "OK: All edges reference existing nodes." in messages
+    assert "ERR: Edge from text_source.txt not an output on that node." in messages
+    assert "ERR: Edge to print_ents.entities not an input on that node." in messages
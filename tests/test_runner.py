@@ -0,0 +1,70 @@
+import json
+from pathlib import Path
+import pytest
+from prompt2pipes.generator import generate_graph_from_task, save_graph_yaml
+from prompt2pipes.ir import Edge, Node
+from prompt2pipes.runner import _BM25Index, _chunk_text, run_graph
+
+def test_chunk_text_windows_and_no_redundant_tail():
+    text = "one two three four five six seven"
+    assert _chunk_text(text, chunk_size=4, overlap=1) == ["one two three four", "four five six seven"]
+    assert _chunk_text(text, chunk_size=10, overlap=2) == [text]
+    assert _chunk_text("", chunk_size=4, overlap=1) == []
+
+def test_bm25_search_matches_pretokenized_path():
+    texts = ["Apple opens an office in Mumbai", "Cricket in Mumbai", "Delhi metro expansion"]
+    index = _BM25Index(texts)
+    hits = index.search("Apple's Mumbai office?", top_k=2)
+    assert hits == index.search_tokens(index.tokenize("Apple's Mumbai office?"), top_k=2)
+    assert [i for i, _ in hits] == [0, 1]
+
+def test_chunk_text_negative_overlap_skips_words_without_empty_chunks():
+    assert _chunk_text("a b c d e f g h i j", chunk_size=3, overlap=-2) == ["a b c", "f g h"]
+    assert _chunk_text("a b c", chunk_size=2, overlap=-5) == ["a b"]
+
+def test_bm25_top_k_breaks_ties_by_chunk_order():
+    texts = [f"filler text {i}" for i in range(300)]
+    index = _BM25Index(texts)
+    assert [i for i, _ in index.search("no such term", top_k=3)] == [0, 1, 2]
+    hits = index.search("filler 5", top_k=3)
+    assert [i for i, _ in hits][0] == 5
+    assert [i for i, _ in hits][1:] == [0, 1]
+
+def test_run_graph_reports_edge_from_undeclared_node(tmp_path: Path, capsys):
+    g = generate_graph_from_task("ner")
+    g.edges[0].source = "ghost"
+    path = tmp_path / "ner.yaml"
+    save_graph_yaml(g, path)
+    assert run_graph(path) is False
+    assert "[runner] No inbound text for SpaCyModel at node 'nlp'." in capsys.readouterr().out
+
+def test_run_graph_rag_template_writes_json_hits(tmp_path: Path, monkeypatch, capsys):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "apple.txt").write_text("Apple is opening a new office in Mumbai next year.")
+    (docs / "cricket.txt").write_text("Mumbai Indians won the cricket final at Wankhede.")
+    (docs / "notes.md").write_text("ignored: not a .txt or .pdf")
+
+    g = generate_graph_from_task("rag-bm25")
+    g.nodes.append(Node(id="dump_hits", component="ConsoleJSONWriter", inputs={"hits": "list[TextChunk]"}))
+    g.edges.append(Edge(source="retriever", source_output="hits", target="dump_hits", target_input="hits"))
+    path = tmp_path / "rag.yaml"
+    save_graph_yaml(g, path)
+
+    monkeypatch.chdir(tmp_path)
+    assert run_graph(path, query="Apple office in Mumbai", docs_path=docs, top_k=2) is True
+    out = capsys.readouterr().out
+    assert "Top passage from apple.txt (chunk 0)" in out
+
+    hits = json.loads((tmp_path / "artifacts" / "dump_hits.json").read_text())
+    assert [h["doc"] for h in hits] == ["apple.txt", "cricket.txt"]
+    assert hits[0]["chunk_id"] == 0 and hits[0]["score"] > hits[1]["score"]
+
+@pytest.mark.parametrize("exclude", ["parser", [["parser"]]])
+def test_spacy_exclude_param_must_be_a_list_of_names(tmp_path: Path, capsys, exclude):
+    g = generate_graph_from_task("ner")
+    g.node_map()["nlp"].params["exclude"] = exclude
+    path = tmp_path / "ner.yaml"
+    save_graph_yaml(g, path)
+    assert run_graph(path, text="Apple is in Mumbai.") is False
+    assert "params.exclude must be a list of component names" in capsys.readouterr().out